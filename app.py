@@ -1,13 +1,20 @@
+import csv
+import hmac
+import io
 import os
-from datetime import datetime, date, time
+from datetime import datetime, date, time, timezone
 from types import SimpleNamespace
 from functools import wraps
+from typing import Final
 
 from flask import (
     Flask, render_template, request, redirect,
-    url_for, flash, session
+    url_for, flash, session, abort, jsonify
 )
-from flask_sqlalchemy import SQLAlchemy
+from flask_caching import Cache
+
+from extensions.database import db
+from models.reservas import Reserva
 
 # ==============================
 # CARGA DE VARIABLES DE ENTORNO
@@ -20,15 +27,31 @@ except ImportError:
     # las variables de entorno del sistema.
     pass
 
-SECRET_KEY = os.getenv(
+# Snapshot del entorno una sola vez al importar: los handlers leen
+# constantes de módulo (LOAD_GLOBAL) en lugar de consultar os.environ.
+SECRET_KEY: Final = os.getenv(
     "SECRET_KEY",
     "dev-secret-unsafe"  # solo para desarrollo si olvidas ponerla
 )
-DATABASE_URL = os.getenv(
-    "DATABASE_URL",
-    "sqlite:///odontologia_dev.db"
-)
-ADMIN_PIN = os.getenv("ADMIN_PIN", "1234")
+# Render/Heroku entregan URLs postgres:// ; SQLAlchemy necesita el
+# dialecto+driver explícito. Se fuerza psycopg (v3): transporte binario
+# (fechas/horas llegan como objetos nativos, sin parseo de texto) y
+# caché de sentencias preparadas integrado en el driver.
+_DB_URL = os.getenv("DATABASE_URL", "sqlite:///odontologia_dev.db")
+for _prefijo in ("postgres://", "postgresql+psycopg2://", "postgresql://"):
+    if _DB_URL.startswith(_prefijo):
+        _DB_URL = "postgresql+psycopg://" + _DB_URL[len(_prefijo):]
+        break
+DATABASE_URL: Final = _DB_URL
+ADMIN_PIN: Final = os.getenv("ADMIN_PIN", "1234")
+# Pre-codificado una sola vez para compararlo en tiempo constante en /login.
+_ADMIN_PIN_BYTES: Final = ADMIN_PIN.encode("utf-8")
+REDIS_URL: Final = os.getenv("REDIS_URL")
+RUN_DB_INIT: Final = os.getenv("RUN_DB_INIT") == "1"
+
+# Singleton reutilizado: datetime.utcnow está deprecado en 3.12+ y además
+# produce datetimes naive que hay que re-etiquetar.
+_UTC: Final = timezone.utc
 
 # ==============================
 # INICIALIZACIÓN DE FLASK
@@ -38,30 +61,162 @@ app.secret_key = SECRET_KEY
 app.config["SQLALCHEMY_DATABASE_URI"] = DATABASE_URL
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
 
-db = SQLAlchemy(app)
-
+# Pool de conexiones afinado para Postgres gestionado (Render/Supabase):
+# reutiliza conexiones ya autenticadas (handshake TCP+TLS se paga una vez),
+# pre_ping descarta conexiones muertas tras el idle-timeout del proveedor
+# y recycle las renueva antes de que el proveedor las corte (~5 min).
+if not DATABASE_URL.startswith("sqlite"):
+    app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {
+        "pool_size": 10,
+        "max_overflow": 5,
+        "pool_pre_ping": True,
+        "pool_recycle": 280,
+        "pool_use_lifo": True,  # mantiene calientes las conexiones más usadas
+        # psycopg prepara del lado del servidor las consultas repetidas
+        "connect_args": {"prepare_threshold": 5},
+    }
+
+db.init_app(app)
 
 # ==============================
-# MODELOS
+# SESIONES EN SERVIDOR (REDIS)
 # ==============================
-class Reserva(db.Model):
-    __tablename__ = "reservas"
+# Con Redis la cookie se reduce a un id de sesión: se evita firmar/verificar
+# todo el contenido con HMAC en cada request y la cookie deja de crecer.
+if REDIS_URL:
+    try:
+        import redis
+        from flask_session import Session
+    except ImportError:
+        # Sin Flask-Session/redis instalados se sigue usando la cookie
+        # firmada por defecto de Flask.
+        pass
+    else:
+        app.config.update(
+            SESSION_TYPE="redis",
+            SESSION_REDIS=redis.from_url(REDIS_URL),
+            SESSION_USE_SIGNER=True,
+        )
+        Session(app)
 
-    id = db.Column(db.Integer, primary_key=True)
-    nombre = db.Column(db.String(120), nullable=False)
-    correo = db.Column(db.String(120), nullable=False)
-    telefono = db.Column(db.String(50), nullable=False)
-    servicio = db.Column(db.String(120), nullable=False)
-    fecha = db.Column(db.Date, nullable=False)
-    hora = db.Column(db.Time, nullable=False)
-    mensaje = db.Column(db.Text, default="")
-    estado = db.Column(db.String(20), default="pendiente")  # pendiente, autorizada, atendida, cancelada
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+# ==============================
+# CACHÉ DE PÁGINAS PÚBLICAS
+# ==============================
+# Las rutas públicas producen el mismo HTML para todos los visitantes:
+# se cachea el render para que Jinja corra una vez por hora, no por request.
+if REDIS_URL:
+    cache = Cache(app, config={
+        "CACHE_TYPE": "RedisCache",
+        "CACHE_REDIS_URL": REDIS_URL,
+        "CACHE_DEFAULT_TIMEOUT": 3600,
+    })
+else:
+    # Caché en memoria del proceso cuando no hay Redis (desarrollo local).
+    cache = Cache(app, config={
+        "CACHE_TYPE": "SimpleCache",
+        "CACHE_DEFAULT_TIMEOUT": 3600,
+    })
 
 
 # ==============================
 # HELPERS
 # ==============================
+def hay_solapamiento(fecha: date, hora: time, exclude_id: int | None = None) -> bool:
+    """Indica si ya existe una reserva activa (pendiente o autorizada)
+    en ese horario. Emite SELECT EXISTS(...): Postgres corta en la
+    primera coincidencia y devuelve un solo booleano."""
+    consulta = db.session.query(Reserva.id).filter(
+        Reserva.fecha == fecha,
+        Reserva.hora == hora,
+        Reserva.estado.in_(("pendiente", "autorizada")),
+    )
+    if exclude_id is not None:
+        consulta = consulta.filter(Reserva.id != exclude_id)
+    return db.session.query(consulta.exists()).scalar()
+
+
+def _reservas_version() -> int:
+    """Versión monotónica de la tabla de reservas: forma parte de la
+    clave de caché del panel, así que incrementarla invalida el caché."""
+    return cache.get("reservas_ver") or 0
+
+
+def _bump_reservas_version() -> None:
+    """Invalida el panel cacheado tras cualquier mutación de reservas."""
+    cache.set("reservas_ver", _reservas_version() + 1, timeout=0)
+
+
+def _cargar_panel(ver, page):
+    """Carga una página del panel. 'ver' solo participa de la clave de
+    caché: mientras nadie mute reservas, la lectura es un GET al caché."""
+    # Solo las columnas que pinta la tabla, paginadas de a 50:
+    # evita materializar toda la tabla en objetos ORM por cada carga.
+    paginacion = (
+        Reserva.query.with_entities(
+            Reserva.id,
+            Reserva.nombre,
+            Reserva.telefono,
+            Reserva.servicio,
+            Reserva.fecha,
+            Reserva.hora,
+            Reserva.mensaje,
+            Reserva.estado,
+        )
+        .order_by(Reserva.fecha.asc(), Reserva.hora.asc())
+        .paginate(page=page, per_page=50, error_out=False)
+    )
+
+    # Conteos por estado en una sola consulta agrupada
+    # (las tarjetas de estadísticas cubren toda la tabla, no solo la página).
+    conteos = dict(
+        db.session.query(Reserva.estado, db.func.count()).group_by(Reserva.estado).all()
+    )
+
+    # Se devuelven estructuras simples (serializables por el caché),
+    # no el objeto Pagination ligado a la sesión.
+    filas = [
+        SimpleNamespace(
+            id=f.id, nombre=f.nombre, telefono=f.telefono, servicio=f.servicio,
+            fecha=f.fecha, hora=f.hora, mensaje=f.mensaje, estado=f.estado,
+        )
+        for f in paginacion.items
+    ]
+    info = SimpleNamespace(
+        page=paginacion.page,
+        pages=paginacion.pages,
+        total=paginacion.total,
+        has_prev=paginacion.has_prev,
+        has_next=paginacion.has_next,
+        prev_num=paginacion.prev_num,
+        next_num=paginacion.next_num,
+    )
+    return filas, info, conteos
+
+
+# Memoizar solo con un backend compartido (Redis): con el fallback
+# SimpleCache cada worker de gunicorn tiene su propia copia del caché,
+# así que el bump de versión hecho por un worker no invalidaría el panel
+# guardado en los demás y el admin vería datos viejos hasta expirar el
+# timeout. Sin Redis, el panel se consulta directo a la base.
+if REDIS_URL:
+    _cargar_panel = cache.memoize(timeout=300)(_cargar_panel)
+
+
+# Tabla de borrado para limpiar teléfonos: un solo pase a nivel C,
+# sin strings intermedios como con .replace(' ','').replace('-','').
+_PHONE_STRIP = str.maketrans("", "", " -")
+
+
+@app.template_filter("phone_normalize")
+def phone_normalize(telefono: str | None) -> str:
+    """Deja el teléfono en el formato de solo dígitos que espera wa.me,
+    anteponiendo el código de país a los móviles peruanos de 9 dígitos."""
+    digitos = (telefono or "").translate(_PHONE_STRIP).lstrip("+")
+    if len(digitos) == 9:
+        digitos = "51" + digitos
+    return digitos
+
+
 def admin_required(view_func):
     """Protege rutas solo para staff logueado."""
     @wraps(view_func)
@@ -76,23 +231,46 @@ def admin_required(view_func):
 @app.context_processor
 def inject_year():
     """Añade 'year' a todos los templates."""
-    return {"year": datetime.utcnow().year}
+    return {"year": datetime.now(_UTC).year}
+
+
+# Páginas públicas con HTML idéntico para todos los visitantes.
+_RUTAS_CACHEABLES = frozenset({"index", "servicios", "equipo", "contacto"})
+
+
+@app.after_request
+def add_cache_headers(resp):
+    """Cache-Control + ETag en las páginas públicas: el navegador
+    revalida con If-None-Match y recibe un 304 sin cuerpo, así el
+    servidor se ahorra el render y la transferencia completos."""
+    if (
+        request.method == "GET"
+        and request.endpoint in _RUTAS_CACHEABLES
+        and resp.status_code == 200
+    ):
+        resp.headers["Cache-Control"] = "public, max-age=300"
+        resp.add_etag()
+        return resp.make_conditional(request)
+    return resp
 
 
 # ==============================
 # RUTAS PÚBLICAS
 # ==============================
 @app.route("/")
+@cache.cached()
 def index():
     return render_template("index.html")
 
 
 @app.route("/servicios")
+@cache.cached()
 def servicios():
     return render_template("servicios.html")
 
 
 @app.route("/equipo")
+@cache.cached()
 def equipo():
     return render_template("equipo.html")
 
@@ -116,8 +294,10 @@ def reservar():
             return "Faltan datos", 400
 
         try:
-            fecha_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-            hora_obj = datetime.strptime(hora_str, "%H:%M").time()
+            # fromisoformat es la vía rápida en C: mismo formato
+            # (YYYY-MM-DD / HH:MM) sin re-parsear el patrón de strptime.
+            fecha_obj = date.fromisoformat(fecha_str)
+            hora_obj = time.fromisoformat(hora_str)
         except ValueError:
             return "Fecha u hora inválidas", 400
 
@@ -134,6 +314,7 @@ def reservar():
         )
         db.session.add(reserva)
         db.session.commit()
+        _bump_reservas_version()
 
         # El JS en reservar.html usa fetch y luego redirige a /reserva_exitosa si response.ok
         return "OK", 200
@@ -148,6 +329,7 @@ def reserva_exitosa():
 
 
 @app.route("/contacto", methods=["GET", "POST"])
+@cache.cached(unless=lambda: request.method != "GET")
 def contacto():
     if request.method == "POST":
         nombre = request.form.get("nombre", "").strip()
@@ -175,7 +357,8 @@ def contacto():
 def login():
     if request.method == "POST":
         pin = request.form.get("pin", "").strip()
-        if pin == ADMIN_PIN:
+        # compare_digest evita el side-channel de timing del == de strings.
+        if hmac.compare_digest(pin.encode("utf-8"), _ADMIN_PIN_BYTES):
             session["is_admin"] = True
             flash("Acceso concedido al panel de control.", "success")
             return redirect(url_for("admin_panel"))
@@ -200,15 +383,29 @@ def logout():
 @app.route("/admin_panel")
 @admin_required
 def admin_panel():
-    reservas = Reserva.query.order_by(Reserva.fecha.asc(), Reserva.hora.asc()).all()
-    return render_template("admin_panel.html", reservas=reservas)
+    page = request.args.get("page", 1, type=int)
+    reservas, paginacion, conteos = _cargar_panel(_reservas_version(), page)
+    return render_template(
+        "admin_panel.html",
+        reservas=reservas,
+        paginacion=paginacion,
+        conteos=conteos,
+    )
 
 
 @app.route("/admin/agregar", methods=["GET", "POST"])
 @admin_required
 def admin_agregar():
+    # El buscador del template solo usa estas cuatro columnas: se
+    # proyectan directamente en vez de hidratar entidades completas
+    # (evita transferir mensaje/correo, que pueden ser largos).
     reservas_pasadas = (
-        Reserva.query.order_by(Reserva.created_at.desc()).limit(20).all()
+        Reserva.query.with_entities(
+            Reserva.nombre, Reserva.telefono, Reserva.fecha, Reserva.hora
+        )
+        .order_by(Reserva.creado_en.desc())
+        .limit(20)
+        .all()
     )
 
     if request.method == "POST":
@@ -240,8 +437,8 @@ def admin_agregar():
             )
 
         try:
-            fecha_obj = datetime.strptime(fecha_str, "%Y-%m-%d").date()
-            hora_obj = datetime.strptime(hora_str, "%H:%M").time()
+            fecha_obj = date.fromisoformat(fecha_str)
+            hora_obj = time.fromisoformat(hora_str)
         except ValueError:
             flash("Fecha u hora inválidas.", "error")
             return render_template(
@@ -250,14 +447,10 @@ def admin_agregar():
                 datos=datos,
             )
 
-        # Verificar colisión de horario (no canceladas)
-        choque = Reserva.query.filter_by(fecha=fecha_obj, hora=hora_obj).filter(
-            Reserva.estado != "cancelada"
-        ).first()
-
-        if choque:
+        # Verificar colisión de horario (reservas pendientes o autorizadas)
+        if hay_solapamiento(fecha_obj, hora_obj):
             flash(
-                f"El horario {fecha_str} {hora_str} ya está ocupado por {choque.nombre}.",
+                f"El horario {fecha_str} {hora_str} ya está ocupado.",
                 "error",
             )
             return render_template(
@@ -279,6 +472,7 @@ def admin_agregar():
         )
         db.session.add(reserva)
         db.session.commit()
+        _bump_reservas_version()
 
         flash("Paciente registrado y cita autorizada correctamente.", "success")
         return redirect(url_for("admin_panel"))
@@ -291,54 +485,294 @@ def admin_agregar():
     )
 
 
+def _filas_csv_validas(stream):
+    """Itera las filas válidas de un CSV de importación como tuplas
+    (nombre, correo, telefono, servicio, fecha, hora, mensaje), con
+    fecha/hora ya convertidas. Las filas malformadas (pocas columnas,
+    fecha u hora ilegibles) se saltan, y de los horarios repetidos
+    dentro del mismo archivo solo pasa la primera aparición — el mismo
+    contrato para los dos dialectos."""
+    vistos = set()
+    texto = io.TextIOWrapper(stream, encoding="utf-8", newline="")
+    for fila in csv.reader(texto):
+        if len(fila) < 6:
+            continue
+        nombre, correo, telefono, servicio, fecha_str, hora_str = (
+            campo.strip() for campo in fila[:6]
+        )
+        mensaje = fila[6].strip() if len(fila) > 6 else ""
+        try:
+            fecha_obj = date.fromisoformat(fecha_str)
+            hora_obj = time.fromisoformat(hora_str)
+        except ValueError:
+            continue
+        if (fecha_obj, hora_obj) in vistos:
+            continue
+        vistos.add((fecha_obj, hora_obj))
+        yield nombre, correo, telefono, servicio, fecha_obj, hora_obj, mensaje
+
+
+@app.route("/admin/agregar_bulk", methods=["POST"])
+@admin_required
+def admin_agregar_bulk():
+    """Importa reservas en lote desde un CSV con columnas
+    nombre, correo, telefono, servicio, fecha, hora, mensaje."""
+    archivo = request.files.get("archivo")
+    if archivo is None or not archivo.filename:
+        flash("Selecciona un archivo CSV para importar.", "error")
+        return redirect(url_for("admin_agregar"))
+
+    try:
+        if db.engine.dialect.name == "postgresql":
+            # COPY hacia una tabla staging y un solo INSERT ... SELECT:
+            # las filas ya validadas se cargan en streaming (sin INSERT
+            # por fila) y el chequeo contra las reservas existentes se
+            # resuelve dentro de Postgres. La staging usa text y el
+            # SELECT recorta con LEFT: un nombre demasiado largo se
+            # trunca en vez de abortar todo el archivo.
+            raw = db.session.connection().connection
+            cur = raw.cursor()
+            cur.execute(
+                """
+                CREATE TEMP TABLE reservas_import (
+                    nombre   text,
+                    correo   text,
+                    telefono text,
+                    servicio text,
+                    fecha    date,
+                    hora     time,
+                    mensaje  text
+                ) ON COMMIT DROP
+                """
+            )
+            with cur.copy(
+                "COPY reservas_import (nombre, correo, telefono, servicio, fecha, hora, mensaje) "
+                "FROM STDIN"
+            ) as copia:
+                for fila in _filas_csv_validas(archivo.stream):
+                    copia.write_row(fila)
+            cur.execute(
+                """
+                INSERT INTO reservas (nombre, correo, telefono, servicio, fecha, hora, mensaje, estado)
+                SELECT LEFT(i.nombre, 120), LEFT(i.correo, 120),
+                       LEFT(i.telefono, 30), LEFT(i.servicio, 100),
+                       i.fecha, i.hora, i.mensaje, 'autorizada'
+                FROM reservas_import i
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM reservas r
+                    WHERE r.fecha = i.fecha AND r.hora = i.hora
+                      AND r.estado IN ('pendiente', 'autorizada')
+                )
+                """
+            )
+            insertadas = cur.rowcount
+            db.session.commit()
+        else:
+            # Fallback para SQLite en desarrollo: mismas filas validadas,
+            # fila por fila pero en una sola transacción.
+            insertadas = 0
+            for nombre, correo, telefono, servicio, fecha_obj, hora_obj, mensaje in (
+                _filas_csv_validas(archivo.stream)
+            ):
+                if hay_solapamiento(fecha_obj, hora_obj):
+                    continue
+                db.session.add(Reserva(
+                    nombre=nombre,
+                    correo=correo,
+                    telefono=telefono,
+                    servicio=servicio,
+                    fecha=fecha_obj,
+                    hora=hora_obj,
+                    mensaje=mensaje,
+                    estado="autorizada",
+                ))
+                insertadas += 1
+            db.session.commit()
+    except Exception:
+        # Archivo ilegible (no es UTF-8, CSV roto) o error de la base:
+        # no se deja la importación a medias ni un 500 sin explicación.
+        db.session.rollback()
+        flash(
+            "No se pudo importar el archivo: verifica que sea un CSV "
+            "válido en UTF-8. No se agregó ninguna reserva.",
+            "error",
+        )
+        return redirect(url_for("admin_agregar"))
+
+    _bump_reservas_version()
+    flash(f"Importación completada: {insertadas} reservas agregadas.", "success")
+    return redirect(url_for("admin_panel"))
+
+
 # ==============================
 # ACCIONES SOBRE RESERVAS
 # ==============================
-@app.route("/autorizar/<int:id>")
-@admin_required
-def autorizar(id):
-    reserva = Reserva.query.get_or_404(id)
-    reserva.estado = "autorizada"
-    db.session.commit()
-    flash(f"Cita de {reserva.nombre} autorizada.", "success")
-    return redirect(url_for("admin_panel"))
+# Statements construidos una sola vez al importar: cada acción es un
+# único UPDATE/DELETE que valida dentro de la base y devuelve el nombre
+# con RETURNING — un round-trip en lugar de SELECT + chequeo + UPDATE.
+_OTRA_RESERVA = db.aliased(Reserva)
+
+# Autorizar exige que la cita siga pendiente y que ninguna otra reserva
+# activa ocupe el mismo horario (mismo predicado que hay_solapamiento).
+_UPD_AUTORIZAR = (
+    db.update(Reserva)
+    .where(
+        Reserva.id == db.bindparam("reserva_id"),
+        Reserva.estado == "pendiente",
+        ~db.select(_OTRA_RESERVA.id)
+        .where(
+            _OTRA_RESERVA.fecha == Reserva.fecha,
+            _OTRA_RESERVA.hora == Reserva.hora,
+            _OTRA_RESERVA.estado.in_(("pendiente", "autorizada")),
+            _OTRA_RESERVA.id != Reserva.id,
+        )
+        .exists(),
+    )
+    .values(estado="autorizada")
+    .returning(Reserva.nombre)
+    .execution_options(synchronize_session=False)
+)
 
 
-@app.route("/atender/<int:id>")
-@admin_required
-def atender(id):
-    reserva = Reserva.query.get_or_404(id)
-    reserva.estado = "atendida"
-    db.session.commit()
-    flash(f"Cita de {reserva.nombre} marcada como atendida.", "success")
-    return redirect(url_for("admin_panel"))
+def _upd_estado(nuevo_estado):
+    """Statement de cambio de estado simple, compilado una vez.
+    El predicado estado != destino evita el UPDATE (y su escritura en
+    el WAL) cuando la cita ya está en ese estado."""
+    return (
+        db.update(Reserva)
+        .where(
+            Reserva.id == db.bindparam("reserva_id"),
+            Reserva.estado != nuevo_estado,
+        )
+        .values(estado=nuevo_estado)
+        .returning(Reserva.nombre)
+        .execution_options(synchronize_session=False)
+    )
 
 
-@app.route("/cancelar/<int:id>")
+_SQL_ESTADO = db.select(Reserva.estado).where(Reserva.id == db.bindparam("reserva_id"))
+
+# Una sola regla de ruteo para las cuatro acciones, con RETURNING nombre
+# para el mensaje flash.
+_ACCIONES = {
+    "autorizar": _UPD_AUTORIZAR,
+    "atender": _upd_estado("atendida"),
+    "cancelar": _upd_estado("cancelada"),
+    "eliminar": (
+        db.delete(Reserva)
+        .where(Reserva.id == db.bindparam("reserva_id"))
+        .returning(Reserva.nombre)
+        .execution_options(synchronize_session=False)
+    ),
+}
+
+_MENSAJES = {
+    "autorizar": ("Cita de {} autorizada.", "success"),
+    "atender": ("Cita de {} marcada como atendida.", "success"),
+    "cancelar": ("Cita de {} cancelada.", "warning"),
+    "eliminar": ("Registro de {} eliminado permanentemente.", "danger"),
+}
+
+# Estado resultante de cada acción (None = fila eliminada).
+_ESTADO_DESTINO = {
+    "autorizar": "autorizada",
+    "atender": "atendida",
+    "cancelar": "cancelada",
+    "eliminar": None,
+}
+
+
+def _prefiere_json():
+    """Clientes tipo fetch/HTMX piden JSON: se responde solo la fila
+    afectada en vez de redirigir a un re-render completo del panel."""
+    tipos = request.accept_mimetypes
+    return tipos["application/json"] > tipos["text/html"]
+
+
+@app.post("/admin/accion/<accion>/<int:id>")
 @admin_required
-def cancelar(id):
-    reserva = Reserva.query.get_or_404(id)
-    reserva.estado = "cancelada"
+def accion(accion, id):
+    stmt = _ACCIONES.get(accion)
+    if stmt is None:
+        abort(404)
+
+    fila = db.session.execute(stmt, {"reserva_id": id}).fetchone()
     db.session.commit()
-    flash(f"Cita de {reserva.nombre} cancelada.", "warning")
+
+    if fila is None:
+        # Un SELECT corto solo en el camino de error, para distinguir
+        # id inexistente, no-op o conflicto.
+        estado = db.session.execute(_SQL_ESTADO, {"reserva_id": id}).scalar()
+        if estado is None:
+            abort(404)
+        if estado == _ESTADO_DESTINO[accion]:
+            motivo = f"La cita ya estaba {estado}."
+            nivel = "warning"
+        elif accion == "autorizar" and estado == "pendiente":
+            motivo = "No se pudo autorizar: el horario ya está ocupado por otra cita."
+            nivel = "error"
+        else:
+            motivo = f"No se puede autorizar una cita {estado}."
+            nivel = "error"
+        if _prefiere_json():
+            return jsonify({"id": id, "estado": estado, "error": motivo}), 409
+        flash(motivo, nivel)
+        return redirect(url_for("admin_panel"))
+
+    _bump_reservas_version()
+    if _prefiere_json():
+        return jsonify({"id": id, "estado": _ESTADO_DESTINO[accion], "nombre": fila.nombre})
+    plantilla, nivel = _MENSAJES[accion]
+    flash(plantilla.format(fila.nombre), nivel)
     return redirect(url_for("admin_panel"))
 
 
-@app.route("/eliminar/<int:id>")
+_ESTADOS_BULK = frozenset({"autorizada", "atendida", "cancelada"})
+
+
+@app.post("/reservas/bulk")
 @admin_required
-def eliminar(id):
-    reserva = Reserva.query.get_or_404(id)
-    db.session.delete(reserva)
+def reservas_bulk():
+    """Cambia el estado de varias reservas en un solo UPDATE y un solo
+    commit, en vez de un request (y una transacción) por fila."""
+    datos = request.get_json(silent=True) or {}
+    ids = datos.get("ids")
+    nuevo_estado = datos.get("estado")
+
+    if nuevo_estado not in _ESTADOS_BULK or not isinstance(ids, list) or not ids:
+        return jsonify({"error": "Se requiere 'ids' (lista no vacía) y un 'estado' válido."}), 400
+    try:
+        ids = [int(i) for i in ids]
+    except (TypeError, ValueError):
+        return jsonify({"error": "'ids' debe contener enteros."}), 400
+
+    actualizadas = db.session.execute(
+        db.update(Reserva)
+        .where(Reserva.id.in_(ids), Reserva.estado != nuevo_estado)
+        .values(estado=nuevo_estado)
+        .execution_options(synchronize_session=False)
+    ).rowcount
     db.session.commit()
-    flash(f"Registro de {reserva.nombre} eliminado permanentemente.", "danger")
-    return redirect(url_for("admin_panel"))
+
+    if actualizadas:
+        _bump_reservas_version()
+    return jsonify({"actualizadas": actualizadas, "estado": nuevo_estado})
 
 
 # ==============================
-# CLI / MAIN
+# INICIALIZACIÓN DE ESQUEMA (OPT-IN)
 # ==============================
-if __name__ == "__main__":
-    # Crear tablas si no existen (solo desarrollo)
+# db.create_all() emite varias consultas de catálogo; pagarlas en cada
+# arranque de worker es latencia perdida cuando la base ya existe.
+# Se ejecuta solo con RUN_DB_INIT=1 (comando pre-deploy o primera vez):
+#   RUN_DB_INIT=1 python -c "import app"
+if RUN_DB_INIT:
     with app.app_context():
         db.create_all()
+
+
+# ==============================
+# CLI / MAIN
+# ==============================
+if __name__ == "__main__":
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,20 @@
+# gunicorn_conf.py
+#
+# Configuración para producción (Render):
+#   gunicorn -c gunicorn_conf.py app:app
+#
+# preload_app importa la aplicación una sola vez en el proceso padre:
+# Flask, SQLAlchemy, los modelos y los statements precompilados quedan
+# compartidos copy-on-write entre workers, lo que reduce decenas de MB
+# de RSS por worker en instancias de 512 MB.
+preload_app = True
+
+# Workers con hilos: la app es mayormente I/O (Postgres), así que pocos
+# procesos + varios hilos rinden mejor que muchos procesos.
+workers = 2
+worker_class = "gthread"
+threads = 4
+
+# El heartbeat de gunicorn escribe en disco; /dev/shm evita bloqueos
+# por I/O lento en discos de red.
+worker_tmp_dir = "/dev/shm"
@@ -1,33 +1,75 @@
 # models/reservas.py
-from datetime import datetime
 from extensions.database import db
+from utils.phones import normalizar_telefono_peru
 
 
 class Reserva(db.Model):
     __tablename__ = "reservas"
 
+    # Índice parcial para el chequeo de solapamiento: solo las reservas
+    # "vivas" (pendiente/autorizada) bloquean un horario, así que el índice
+    # cubre únicamente esas filas y la búsqueda es un probe de B-tree.
+    __table_args__ = (
+        db.Index(
+            "ix_reserva_fecha_hora_activa",
+            "fecha",
+            "hora",
+            postgresql_where=db.text("estado IN ('pendiente', 'autorizada')"),
+        ),
+        # Índice compuesto para el panel admin: cubre los conteos
+        # agrupados por estado (index-only scan) y cualquier listado
+        # filtrado por estado ordenado por fecha/hora.
+        db.Index("ix_reservas_estado_fecha_hora", "estado", "fecha", "hora"),
+    )
+
     # bigserial en Postgres → BigInteger en SQLAlchemy
-    id = db.Column(db.BigInteger, primary_key=True)
+    # (SQLite necesita INTEGER exacto para el autoincremento del rowid)
+    id = db.Column(
+        db.BigInteger().with_variant(db.Integer, "sqlite"),
+        primary_key=True,
+    )
 
     # Coincidir tamaños con la tabla
     nombre = db.Column(db.String(120), nullable=False)
+    correo = db.Column(db.String(120), nullable=False, default="")
     telefono = db.Column(db.String(30))  # en la tabla NO es NOT NULL
     servicio = db.Column(db.String(100), nullable=False)
 
     fecha = db.Column(db.Date, nullable=False)
     hora = db.Column(db.Time, nullable=False)
 
-    mensaje = db.Column(db.Text)
+    mensaje = db.Column(db.Text, default="")
 
-    # En la tabla: NOT NULL DEFAULT 'pendiente'
-    estado = db.Column(db.String(20), nullable=False, default="pendiente")
+    # Defaults del lado del servidor: la base completa estos valores,
+    # así que Python no calcula nada por fila y los inserts masivos
+    # (executemany / INSERT ... SELECT / COPY) no necesitan tocarlos.
+    # ENUM nativo en Postgres: 4 bytes por fila/entrada de índice en vez
+    # de un varchar de hasta 20 caracteres (en SQLite: VARCHAR + CHECK).
+    estado = db.Column(
+        db.Enum(
+            "pendiente", "autorizada", "atendida", "cancelada",
+            name="reserva_estado",
+        ),
+        nullable=False,
+        server_default=db.text("'pendiente'"),
+    )
 
     # timestamptz en Postgres
     creado_en = db.Column(
         db.DateTime(timezone=True),
         nullable=False,
-        default=datetime.utcnow,  # también podrías usar server_default=db.func.now()
+        server_default=db.func.now(),
     )
 
     def __repr__(self):
-        return f"<Reserva {self.id}: {self.nombre} - {self.estado}>"
\ No newline at end of file
+        return f"<Reserva {self.id}: {self.nombre} - {self.estado}>"
+
+
+@db.event.listens_for(Reserva, "before_insert")
+@db.event.listens_for(Reserva, "before_update")
+def _normalizar_telefono(mapper, connection, target):
+    """Normaliza el teléfono una sola vez al escribir: los templates
+    imprimen la columna tal cual, sin re-normalizar fila por fila en
+    cada render. La columna String(30) ya admite '+51 XXX XXX XXX'."""
+    if target.telefono:
+        target.telefono = normalizar_telefono_peru(target.telefono)
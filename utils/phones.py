@@ -1,6 +1,18 @@
 # utils/phones.py
-import re
+from functools import lru_cache
 
+# Tabla de borrado construida una sola vez: elimina todo carácter Latin-1
+# que no sea dígito en un único pase a nivel C, sin pasar por la máquina
+# de estados de `re` (ruta caliente al validar formularios en lote).
+_SOLO_DIGITOS = str.maketrans(
+    '', '', ''.join(chr(c) for c in range(256) if not 48 <= c <= 57)
+)
+
+
+# La función es determinista sobre strings inmutables y los mismos
+# números se repiten (re-renders del panel, validaciones): los repetidos
+# se resuelven con un lookup de dict en vez de recalcular.
+@lru_cache(maxsize=4096)
 def normalizar_telefono_peru(telefono: str) -> str:
     """
     Normaliza un número de teléfono peruano a formato legible internacional (+51).
@@ -16,20 +28,25 @@ def normalizar_telefono_peru(telefono: str) -> str:
     """
     if not telefono:
         return ""
-    
+
+    # Camino rápido: la mayoría de los números llegan ya como
+    # "9xxxxxxxx"; se salta el translate y los chequeos de prefijo.
+    if len(telefono) == 9 and telefono[0] == '9' and telefono.isdigit():
+        return f"+51 {telefono[:3]} {telefono[3:6]} {telefono[6:]}"
+
     # Eliminar todo lo que no sea dígito
-    digitos = re.sub(r'\D', '', telefono)
-    
-    # Caso 1: empieza con 0 y tiene 10 dígitos → quitar 0 inicial
-    if digitos.startswith('0') and len(digitos) == 10:
-        digitos = digitos[1:]  # → 9 dígitos
-    
-    # Caso 2: empieza con 51 y tiene 11 dígitos → quitar 51
-    if digitos.startswith('51') and len(digitos) == 11:
-        digitos = digitos[2:]  # → 9 dígitos
+    digitos = telefono.translate(_SOLO_DIGITOS)
     
+    # Despacho por longitud: la comparación barata (len) descarta la rama
+    # antes de mirar caracteres, sin llamadas a startswith.
+    n = len(digitos)
+    if n == 10 and digitos[0] == '0':
+        digitos = digitos[1:]  # quitar 0 inicial → 9 dígitos
+    elif n == 11 and digitos[0] == '5' and digitos[1] == '1':
+        digitos = digitos[2:]  # quitar prefijo 51 → 9 dígitos
+
     # Ahora debe tener 9 dígitos y empezar con 9 (móvil peruano)
-    if len(digitos) == 9 and digitos.startswith('9'):
+    if len(digitos) == 9 and digitos[0] == '9':
         return f"+51 {digitos[:3]} {digitos[3:6]} {digitos[6:]}"
     
     # Si no cumple, devolver los dígitos limpios (o cadena vacía)